@@ -1,10 +1,134 @@
 import streamlit as st
+import functools
 import itertools
 import random
+import math
+import numpy as np
 import pandas as pd
 from collections import defaultdict
 import altair as alt
 
+# ==========================================
+# 🧭 STRATEGY TABLES (Hold Priorities)
+# ==========================================
+# Ordered hold-priority lists per deuce count, as (kind, arg, reason) rules.
+# First matching rule wins; every list must end with "all" or "deuces".
+#   ("all", None, reason)      -> hold all five cards
+#   ("made", {ranks}, reason)  -> hold all if the dealt hand is one of these ranks
+#   ("royal", k, reason)       -> hold deuces + k suited cards from 10-A
+#   ("sf_draw", k, reason)     -> hold deuces + k suited cards inside a 5-rank window
+#   ("pair", None, reason)     -> hold every card whose rank is paired
+#   ("deuces", None, reason)   -> hold deuces only (always matches)
+AGGRESSIVE_STRATEGY = {
+    4: [("all", None, "Victory! Hold All.")],
+    3: [
+        ("made", {"Wild Royal", "5 of a Kind"}, "Jackpot! Hold All."),
+        ("deuces", None, "Hold 3 Deuces."),
+    ],
+    2: [
+        ("made", {"Wild Royal", "5 of a Kind", "Straight Flush"}, "Monster! Hold All."),
+        ("made", {"4 of a Kind"}, "Hold Made Quads."),
+        ("royal", 2, "Hunt the Wild Royal."),
+        ("deuces", None, "Hold 2 Deuces."),
+    ],
+    1: [
+        ("made", {"Wild Royal", "5 of a Kind", "Straight Flush", "Full House"}, "Hold Made Hand."),
+        ("made", {"4 of a Kind"}, "Hold Quads."),
+        ("royal", 3, "Shoot for Wild Royal."),
+        ("sf_draw", 3, "Straight Flush Draw."),
+        ("royal", 2, "3 to Wild Royal."),
+        ("deuces", None, "Hold Deuce."),
+    ],
+    0: [
+        ("made", {"Natural Royal", "Straight Flush", "4 of a Kind", "Full House", "Flush", "Straight", "3 of a Kind"}, "Made Hand. Hold."),
+        ("royal", 4, "4 to Royal!"),
+        ("royal", 3, "3 to Royal."),
+        ("pair", None, "Hold Pair."),
+        ("deuces", None, "Trash. Redraw 5."),
+    ],
+}
+
+# Low-paying 5oak: keep made Flushes/Straights instead of drawing.
+DEFENSIVE_STRATEGY = {
+    4: AGGRESSIVE_STRATEGY[4],
+    3: AGGRESSIVE_STRATEGY[3],
+    2: [
+        ("made", {"Wild Royal", "5 of a Kind", "Straight Flush"}, "Monster! Hold All."),
+        ("made", {"4 of a Kind"}, "Hold Made Quads."),
+        ("royal", 2, "Hunt the Wild Royal."),
+        ("made", {"Flush"}, "Defensive: Hold Flush."),
+        ("deuces", None, "Hold 2 Deuces."),
+    ],
+    1: [
+        ("made", {"Wild Royal", "5 of a Kind", "Straight Flush", "Full House"}, "Hold Made Hand."),
+        ("made", {"4 of a Kind"}, "Hold Quads."),
+        ("made", {"Flush"}, "Defensive: Hold Flush."),
+        ("made", {"Straight"}, "Defensive: Hold Straight."),
+        ("royal", 3, "Shoot for Wild Royal."),
+        ("sf_draw", 3, "Straight Flush Draw."),
+        ("royal", 2, "3 to Wild Royal."),
+        ("deuces", None, "Hold Deuce."),
+    ],
+    0: AGGRESSIVE_STRATEGY[0],
+}
+
+# Keyed by variant or strategy mode. A variant's own list (e.g. "NSUD") wins over its mode.
+STRATEGIES = {"AGGRESSIVE": AGGRESSIVE_STRATEGY, "DEFENSIVE": DEFENSIVE_STRATEGY}
+
+# Rank bitmasks (bit n = rank value n, Ace = 14)
+ROYAL_MASK = sum(1 << r for r in (10, 11, 12, 13, 14))
+# Every 5-rank straight window a non-deuce draw can sit in (deuces are wild, so 2 is never a bit)
+STRAIGHT_WINDOWS = [(1 << 14) | sum(1 << r for r in (3, 4, 5))] + [sum(1 << r for r in range(low, low + 5)) for low in range(3, 11)]
+
+# Every non-deuce rank bit (3-A)
+ALL_RANKS = sum(1 << r for r in range(3, 15))
+
+@functools.lru_cache(maxsize=None)
+def compile_draw_table(masks, k):
+    # Map every suit rank-mask holding k cards inside one of `masks` to the
+    # k-card rank sets it can keep, so matching is a single dict lookup per suit.
+    # Memoized on (masks, k): rules shared across modes share one table.
+    table = defaultdict(set)
+    for mask in masks:
+        for combo in itertools.combinations([1 << r for r in range(3, 15) if mask & (1 << r)], k):
+            keep = sum(combo)
+            free = ALL_RANKS & ~keep
+            extra = free
+            while True:
+                table[keep | extra].add(keep)
+                if extra == 0: break
+                extra = (extra - 1) & free
+    return {suit_mask: tuple(keeps) for suit_mask, keeps in table.items()}
+
+def compile_strategy(strategy):
+    # Turn each rule into (kind, match, reason), with draw rules precompiled to lookup tables.
+    if set(strategy) != {0, 1, 2, 3, 4}:
+        raise ValueError("Strategy needs hold rules for 0-4 deuces")
+    compiled = {}
+    for deuce_count, rules in strategy.items():
+        if not rules or rules[-1][0] not in ("all", "deuces"):
+            raise ValueError(f"{deuce_count}-deuce rules must end with an 'all' or 'deuces' rule")
+        compiled[deuce_count] = []
+        for kind, arg, reason in rules:
+            if kind == "made":
+                compiled[deuce_count].append((kind, frozenset(arg), reason))
+            elif kind == "royal":
+                compiled[deuce_count].append((kind, compile_draw_table((ROYAL_MASK,), arg), reason))
+            elif kind == "sf_draw":
+                compiled[deuce_count].append((kind, compile_draw_table(tuple(STRAIGHT_WINDOWS), arg), reason))
+            elif kind in ("all", "pair", "deuces"):
+                compiled[deuce_count].append((kind, None, reason))
+            else:
+                raise ValueError(f"Unknown strategy rule: {kind}")
+    return compiled
+
+@st.cache_resource(show_spinner=False)
+def get_compiled_strategies():
+    # Built once per process; Streamlit re-executes this module on every full rerun.
+    return {mode: compile_strategy(s) for mode, s in STRATEGIES.items()}
+
+COMPILED_STRATEGIES = get_compiled_strategies()
+
 # ==========================================
 # 🧬 CORE LOGIC: DEUCES WILD ENGINE
 # ==========================================
@@ -30,6 +154,7 @@ class DeucesWildEngine:
                 self.strategy_mode = "DEFENSIVE"
             else:
                 self.strategy_mode = "AGGRESSIVE"
+        self.strategy = COMPILED_STRATEGIES.get(variant, COMPILED_STRATEGIES[self.strategy_mode])
 
     def get_rank_val(self, card):
         r = card[:-1].upper()
@@ -83,68 +208,33 @@ class DeucesWildEngine:
         deuces = [c for c in hand if c.startswith('2')]
         non_deuces = [c for c in hand if not c.startswith('2')]
         current_rank = self.evaluate_hand(hand)
-        
-        if len(deuces) == 4: return hand, "Victory! Hold All."
-        if len(deuces) == 3:
-            if current_rank in ["Wild Royal", "5 of a Kind"]: return hand, "Jackpot! Hold All."
-            return deuces, "Hold 3 Deuces."
-        if len(deuces) == 2:
-            if current_rank in ["Wild Royal", "5 of a Kind", "Straight Flush"]: return hand, "Monster! Hold All."
-            if current_rank == "4 of a Kind": return hand, "Hold Made Quads."
-            royals = {10,11,12,13,14}
-            for combo in itertools.combinations(non_deuces, 2):
-                vals = {self.get_rank_val(c) for c in combo}
-                suits = {c[-1] for c in combo}
-                if len(suits) == 1 and vals.issubset(royals):
-                    return deuces + list(combo), "Hunt the Wild Royal."
-            if self.strategy_mode == "DEFENSIVE" and current_rank == "Flush": return hand, "Defensive: Hold Flush."
-            return deuces, "Hold 2 Deuces."
-        if len(deuces) == 1:
-            if current_rank in ["Wild Royal", "5 of a Kind", "Straight Flush", "Full House"]: return hand, "Hold Made Hand."
-            if current_rank == "4 of a Kind": return hand, "Hold Quads."
-            if self.strategy_mode == "DEFENSIVE":
-                if current_rank == "Flush": return hand, "Defensive: Hold Flush."
-                if current_rank == "Straight": return hand, "Defensive: Hold Straight."
-            royals = {10,11,12,13,14}
-            for combo in itertools.combinations(non_deuces, 3):
-                vals = {self.get_rank_val(c) for c in combo}
-                suits = {c[-1] for c in combo}
-                if len(suits) == 1 and vals.issubset(royals): return deuces + list(combo), "Shoot for Wild Royal."
-            for combo in itertools.combinations(non_deuces, 3):
-                 vals = sorted([self.get_rank_val(c) for c in combo])
-                 suits = [c[-1] for c in combo]
-                 if len(set(suits)) == 1:
-                     if (vals[-1] - vals[0] <= 4): return deuces + list(combo), "Straight Flush Draw."
-                     if 14 in vals:
-                         wheel_v = [x for x in vals if x!=14]
-                         if wheel_v and wheel_v[-1] <= 5: return deuces + list(combo), "Straight Flush Draw."
-            for combo in itertools.combinations(non_deuces, 2):
-                vals = {self.get_rank_val(c) for c in combo}
-                suits = {c[-1] for c in combo}
-                if len(suits) == 1 and vals.issubset(royals): return deuces + list(combo), "3 to Wild Royal."
-            return deuces, "Hold Deuce."
-        if len(deuces) == 0:
-            if current_rank in ["Natural Royal", "Straight Flush", "4 of a Kind", "Full House", "Flush", "Straight", "3 of a Kind"]: 
-                return hand, "Made Hand. Hold."
-            royals = {10,11,12,13,14}
-            for combo in itertools.combinations(non_deuces, 4):
-                vals = {self.get_rank_val(c) for c in combo}
-                suits = {c[-1] for c in combo}
-                if len(suits) == 1 and vals.issubset(royals): return list(combo), "4 to Royal!"
-            for combo in itertools.combinations(non_deuces, 3):
-                vals = {self.get_rank_val(c) for c in combo}
-                suits = {c[-1] for c in combo}
-                if len(suits) == 1 and vals.issubset(royals): return list(combo), "3 to Royal."
-            pairs = []
-            seen = set()
-            for c in hand:
-                r = c[:-1]
-                if r in seen: pairs.append(r)
-                seen.add(r)
-            if pairs:
-                pair_cards = [c for c in hand if c[:-1] in pairs]
-                return pair_cards, "Hold Pair."
-            return [], "Trash. Redraw 5."
+
+        # Encode non-deuces once: a rank bit per card, OR'd into per-suit masks
+        card_bits = [1 << self.get_rank_val(c) for c in non_deuces]
+        card_suits = [c[-1] for c in non_deuces]
+        suit_masks = defaultdict(int)
+        for bit, suit in zip(card_bits, card_suits): suit_masks[suit] |= bit
+
+        for kind, match, reason in self.strategy[len(deuces)]:
+            if kind == "all": return hand, reason
+            if kind == "made":
+                if current_rank in match: return hand, reason
+            elif kind in ("royal", "sf_draw"):
+                # Earliest k cards (in hand order) among this suit's precompiled keeps
+                best = None
+                for suit, suit_mask in suit_masks.items():
+                    for keep in match.get(suit_mask & ALL_RANKS, ()):
+                        picks = [i for i, c in enumerate(non_deuces) if card_suits[i] == suit and card_bits[i] & keep]
+                        if best is None or picks < best: best = picks
+                if best is not None: return deuces + [non_deuces[i] for i in best], reason
+            elif kind == "pair":
+                masks_list = list(suit_masks.values())
+                paired = 0
+                for i, a in enumerate(masks_list):
+                    for b in masks_list[i+1:]: paired |= a & b
+                if paired: return [c for c, bit in zip(non_deuces, card_bits) if bit & paired], reason
+            elif kind == "deuces":
+                return deuces, reason
 
     def calculate_outcome_probs(self, held_cards, iterations=2000):
         suits = ['s', 'h', 'd', 'c']
@@ -165,19 +255,94 @@ class DeucesWildEngine:
         probs = {k: v/iterations for k, v in counts.items()}
         return ev, probs
 
+# ==========================================
+# 📈 HELPER: PERCENTILE ENVELOPE (Simulation)
+# ==========================================
+ROYAL_RANKS = ['10', 'J', 'Q', 'K', 'A']
+
+def get_jackpot_probs(held, dealt):
+    # Exact chance that drawing to `held` (47 unseen cards) makes a Natural Royal
+    # or Four Deuces. Too rare to sample: a Natural Royal is ~1 in 40k+ hands.
+    n = 5 - len(held)
+    ways = math.comb(47, n)
+    discarded = [c for c in dealt if c not in held]
+    held_deuces = sum(1 for c in held if c.startswith('2'))
+
+    p_royal = 0.0
+    if held_deuces == 0:
+        held_suits = {c[-1] for c in held}
+        if len(held_suits) <= 1:
+            for s in (held_suits or ['s', 'h', 'd', 'c']):
+                needed = [f"{r}{s}" for r in ROYAL_RANKS if f"{r}{s}" not in held]
+                if len(needed) == n and not any(c in discarded for c in needed):
+                    p_royal += 1 / ways
+
+    p_deuces = 0.0
+    missing = 4 - held_deuces
+    if n >= missing and not any(c.startswith('2') for c in discarded):
+        p_deuces = math.comb(47 - missing, n - missing) / ways
+    return {"Natural Royal": p_royal, "Four Deuces": p_deuces}
+
+@st.cache_data(show_spinner=False, persist="disk")
+def get_hand_payout_distribution(variant, paytable_items, samples=60000, bet=1.25, seed=7):
+    # Play `samples` full hands (deal -> Amy Bot hold -> draw) once per paytable
+    # and return the net $ result of a single hand with its probability.
+    # Jackpots are added analytically per hand instead of counted.
+    # Also returns the strategy's expected return per $ bet.
+    paytable = dict(paytable_items)
+    sim_engine = DeucesWildEngine(variant=variant)
+    sim_engine.paytable = paytable
+    rng = random.Random(seed)
+    suits = ['s', 'h', 'd', 'c']
+    ranks = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
+    full_deck = [f"{r}{s}" for r in ranks for s in suits]
+    counts = defaultdict(float)
+    for _ in range(samples):
+        cards = rng.sample(full_deck, 10)
+        dealt, stub = cards[:5], cards[5:]
+        held, _ = sim_engine.get_best_hold(dealt)
+        final_rank = sim_engine.evaluate_hand(list(held) + stub[:5 - len(held)])
+        jackpots = get_jackpot_probs(held, dealt)
+        if final_rank not in jackpots: counts[final_rank] += 1
+        for rank_name, p in jackpots.items(): counts[rank_name] += p
+    outcomes = np.array([(paytable.get(k, 0) - 1) * bet for k in counts], dtype=np.float32)
+    probs = np.array(list(counts.values()), dtype=np.float64)
+    probs = probs / probs.sum()
+    expected_return = 1 + float((outcomes * probs).sum()) / bet
+    return outcomes, probs, expected_return
+
+@st.cache_data(show_spinner=False)
+def get_bankroll_envelope(variant, paytable_items, num_hands, num_paths=100_000, start=40.0, seed=11):
+    # Percentile bands of bankroll after each hand. Paths are built as one
+    # cumulative sum over a (paths x hands) matrix of sampled per-hand results.
+    outcomes, probs, _ = get_hand_payout_distribution(variant, paytable_items)
+    rng = np.random.default_rng(seed)
+    draws = rng.choice(len(outcomes), size=(num_paths, max(num_hands - 1, 0)), p=probs)
+    paths = start + np.cumsum(outcomes[draws], axis=1)
+    paths = np.hstack([np.full((num_paths, 1), start, dtype=paths.dtype), paths])
+    p5, p25, p50, p75, p95 = np.percentile(paths, [5, 25, 50, 75, 95], axis=0)
+    return pd.DataFrame({
+        'Hand': range(num_hands),
+        'P5': p5, 'P25': p25, 'P50': p50, 'P75': p75, 'P95': p95
+    })
+
 # ==========================================
 # 📄 HELPER: RENDER CHART
 # ==========================================
-def render_bankroll_chart(hands, archetype="Generic"):
+def render_bankroll_chart(hands, archetype="Generic", envelope=None):
     chart_data = pd.DataFrame({'Hand': range(len(hands)), 'Bankroll': hands})
-    
+    y_min, y_max = min(hands), max(hands)
+    if envelope is not None:
+        y_min = min(y_min, float(envelope['P5'].min()))
+        y_max = max(y_max, float(envelope['P95'].max()))
+
     # 1. The Main Line
     line = alt.Chart(chart_data).mark_line(
         point=True, 
         strokeWidth=3
     ).encode(
         x=alt.X('Hand', axis=alt.Axis(title='Hands Played')),
-        y=alt.Y('Bankroll', scale=alt.Scale(domain=[min(hands)-5, max(hands)+5]), axis=alt.Axis(title='Bankroll ($)')),
+        y=alt.Y('Bankroll', scale=alt.Scale(domain=[y_min-5, y_max+5]), axis=alt.Axis(title='Bankroll ($)')),
         color=alt.condition(
             alt.datum.Bankroll > 40,
             alt.value("#4cea72"),  # Green if profit
@@ -217,13 +382,39 @@ def render_bankroll_chart(hands, archetype="Generic"):
     )
 
     # Combine
-    chart = (area + waterline + stop_loss + profit_target + line).properties(
+    layers = area + waterline + stop_loss + profit_target + line
+
+    # 6. Percentile Fan (Simulated 5/25/50/75/95 envelope)
+    if envelope is not None:
+        outer_band = alt.Chart(envelope).mark_area(opacity=0.12, color='#8ab4f8').encode(
+            x='Hand', y='P5', y2='P95'
+        )
+        inner_band = alt.Chart(envelope).mark_area(opacity=0.25, color='#8ab4f8').encode(
+            x='Hand', y='P25', y2='P75'
+        )
+        median = alt.Chart(envelope).mark_line(
+            color='#8ab4f8',
+            strokeDash=[2,2],
+            size=1
+        ).encode(x='Hand', y='P50')
+        layers = outer_band + inner_band + median + layers
+
+    chart = layers.properties(
         height=250,
         title=f"{archetype} Session Arc"
     )
     
     st.altair_chart(chart, use_container_width=True)
 
+# ==========================================
+# 📄 HELPER: PAYTABLE (Sidebar)
+# ==========================================
+@st.cache_data(show_spinner=False)
+def get_paytable_df(variant):
+    temp_engine = DeucesWildEngine(variant)
+    pt_data = {"Hand": list(temp_engine.paytable.keys()), "1 Coin": list(temp_engine.paytable.values())}
+    return pd.DataFrame(pt_data)
+
 # ==========================================
 # 📄 HELPER: SHOW RULES (Merged)
 # ==========================================
@@ -241,9 +432,7 @@ def show_rules_page():
             st.markdown("🛑 **Action:** HARD STOP LOSS.")
         with c2:
             st.write("") # Spacer
-            if st.button("🔍 View Profile", key="btn_vacuum"):
-                st.session_state.current_view = "detail_vacuum"
-                st.rerun()
+            st.button("🔍 View Profile", key="btn_vacuum", on_click=lambda: st.session_state.update({"current_view": "detail_vacuum"}))
 
     # 2. THE TEASE
     with st.container(border=True):
@@ -254,9 +443,7 @@ def show_rules_page():
             st.markdown("🛑 **Action:** EXIT IMMEDIATELY.")
         with c2:
             st.write("")
-            if st.button("🔍 View Profile", key="btn_tease"):
-                st.session_state.current_view = "detail_tease"
-                st.rerun()
+            st.button("🔍 View Profile", key="btn_tease", on_click=lambda: st.session_state.update({"current_view": "detail_tease"}))
 
     # 3. THE ZOMBIE
     with st.container(border=True):
@@ -267,9 +454,7 @@ def show_rules_page():
             st.markdown("⏱️ **Action:** SET TIMER (Do NOT Grind).")
         with c2:
             st.write("")
-            if st.button("🔍 View Profile", key="btn_zombie"):
-                st.session_state.current_view = "detail_zombie"
-                st.rerun()
+            st.button("🔍 View Profile", key="btn_zombie", on_click=lambda: st.session_state.update({"current_view": "detail_zombie"}))
 
     # 4. THE SNIPER
     with st.container(border=True):
@@ -280,9 +465,7 @@ def show_rules_page():
             st.markdown("💰 **Action:** CASH OUT.")
         with c2:
             st.write("")
-            if st.button("🔍 View Profile", key="btn_sniper"):
-                st.session_state.current_view = "detail_sniper"
-                st.rerun()
+            st.button("🔍 View Profile", key="btn_sniper", on_click=lambda: st.session_state.update({"current_view": "detail_sniper"}))
 
     # 5. HARD DECK
     with st.container(border=True):
@@ -380,9 +563,7 @@ with st.sidebar:
     if "AIRPORT" in variant_input: selected_variant = "AIRPORT"
     
     with st.expander("📊 View Paytable"):
-        temp_engine = DeucesWildEngine(selected_variant)
-        pt_data = {"Hand": list(temp_engine.paytable.keys()), "1 Coin": list(temp_engine.paytable.values())}
-        st.dataframe(pd.DataFrame(pt_data), hide_index=True)
+        st.dataframe(get_paytable_df(selected_variant), hide_index=True)
             
     st.info(f"Mode: {selected_variant}")
 
@@ -395,140 +576,142 @@ if 'current_view' not in st.session_state: st.session_state.current_view = "main
 # 📄 PAGE 1: SCORECARD (TRACKER)
 # ==========================================
 if page_selection == "📊 Scorecard":
-    st.title("Momentum Tracker")
-
-    # --- 🧮 CALCULATE METRICS ---
-    history = st.session_state.history
-    total_hands = len(history)
-    total_wins = sum(history)
-    
-    # Session Metrics
-    session_pct = (total_wins / total_hands * 100) if total_hands > 0 else 0
-    s_class = "hot" if session_pct >= 45 else "neutral"
-
-    # Last 10 Metrics
-    last_10 = history[-10:]
-    l10_wins = sum(last_10)
-    l10_pct = (l10_wins / len(last_10) * 100) if last_10 else 0
-    l10_class = "hot" if l10_wins >= 6 else "cold" if l10_wins <= 3 else "neutral"
-
-    # Last 5 Metrics
-    last_5 = history[-5:]
-    l5_wins = sum(last_5)
-    l5_pct = (l5_wins / len(last_5) * 100) if last_5 else 0
-    l5_class = "hot" if l5_wins >= 3 else "cold" if l5_wins <= 1 else "neutral"
-
-    # --- 📊 FLEXBOX DASHBOARD (Forced Horizontal on Mobile) ---
-    dashboard_html = f"""
-    <div class="dashboard-container">
-        <div class="metric-card {s_class}">
-            <span class="metric-lbl">Session</span>
-            <span class="metric-val">{session_pct:.0f}%</span>
-        </div>
-        <div class="metric-card {l10_class}">
-            <span class="metric-lbl">Last 10</span>
-            <span class="metric-val">{l10_pct:.0f}%</span>
-        </div>
-        <div class="metric-card {l5_class}">
-            <span class="metric-lbl">Last 5</span>
-            <span class="metric-val">{l5_pct:.0f}%</span>
+    # Fragment: WON/LOST taps rerun only this tracker, not the CSS/sidebar/routing above.
+    @st.fragment
+    def scorecard_fragment():
+        st.title("Momentum Tracker")
+
+        # --- 🧮 CALCULATE METRICS ---
+        history = st.session_state.history
+        total_hands = len(history)
+        total_wins = sum(history)
+
+        # Session Metrics
+        session_pct = (total_wins / total_hands * 100) if total_hands > 0 else 0
+        s_class = "hot" if session_pct >= 45 else "neutral"
+
+        # Last 10 Metrics
+        last_10 = history[-10:]
+        l10_wins = sum(last_10)
+        l10_pct = (l10_wins / len(last_10) * 100) if last_10 else 0
+        l10_class = "hot" if l10_wins >= 6 else "cold" if l10_wins <= 3 else "neutral"
+
+        # Last 5 Metrics
+        last_5 = history[-5:]
+        l5_wins = sum(last_5)
+        l5_pct = (l5_wins / len(last_5) * 100) if last_5 else 0
+        l5_class = "hot" if l5_wins >= 3 else "cold" if l5_wins <= 1 else "neutral"
+
+        # --- 📊 FLEXBOX DASHBOARD (Forced Horizontal on Mobile) ---
+        dashboard_html = f"""
+        <div class="dashboard-container">
+            <div class="metric-card {s_class}">
+                <span class="metric-lbl">Session</span>
+                <span class="metric-val">{session_pct:.0f}%</span>
+            </div>
+            <div class="metric-card {l10_class}">
+                <span class="metric-lbl">Last 10</span>
+                <span class="metric-val">{l10_pct:.0f}%</span>
+            </div>
+            <div class="metric-card {l5_class}">
+                <span class="metric-lbl">Last 5</span>
+                <span class="metric-val">{l5_pct:.0f}%</span>
+            </div>
         </div>
-    </div>
-    """
-    st.markdown(dashboard_html, unsafe_allow_html=True)
-    st.caption(f"Hands: {total_hands} | Wins: {total_wins}")
-    
-    st.divider()
+        """
+        st.markdown(dashboard_html, unsafe_allow_html=True)
+        st.caption(f"Hands: {total_hands} | Wins: {total_wins}")
 
-    # --- 📜 HISTORY WINDOW (Newest Hands First) ---
-    with st.container(height=300, border=True):
-        if not history: 
-            st.write("No hands played.")
-            st.caption("Results will appear here.")
-        else:
-            import math
-            num_rows = math.ceil(total_hands / 5)
-            for row_idx in range(num_rows - 1, -1, -1):
-                start_index = row_idx * 5
-                end_index = start_index + 5
-                batch = history[start_index : end_index]
-                start_hand_num = start_index + 1
-                end_hand_num = start_index + len(batch)
-                icons = "".join(["✅ " if x==1 else "❌ " for x in batch])
-                st.write(f"**Hands {start_hand_num}-{end_hand_num}:** {icons}")
-
-    # --- 🕹️ FLOATING BUTTONS (Fixed Position) ---
-    b1, b2 = st.columns(2)
-    with b1:
-        if st.button("✅ WON"):
-            st.session_state.history.append(1)
-            st.rerun()
-    with b2:
-        if st.button("❌ LOST"):
-            st.session_state.history.append(0)
-            st.rerun()
-            
-    if st.button("🗑️ Reset"):
-        st.session_state.history = []
-        st.rerun()
+        st.divider()
+
+        # --- 📜 HISTORY WINDOW (Newest Hands First) ---
+        with st.container(height=300, border=True):
+            if not history: 
+                st.write("No hands played.")
+                st.caption("Results will appear here.")
+            else:
+                num_rows = math.ceil(total_hands / 5)
+                for row_idx in range(num_rows - 1, -1, -1):
+                    start_index = row_idx * 5
+                    end_index = start_index + 5
+                    batch = history[start_index : end_index]
+                    start_hand_num = start_index + 1
+                    end_hand_num = start_index + len(batch)
+                    icons = "".join(["✅ " if x==1 else "❌ " for x in batch])
+                    st.write(f"**Hands {start_hand_num}-{end_hand_num}:** {icons}")
+
+        # --- 🕹️ FLOATING BUTTONS (Fixed Position) ---
+        b1, b2 = st.columns(2)
+        with b1:
+            st.button("✅ WON", on_click=lambda: st.session_state.history.append(1))
+        with b2:
+            st.button("❌ LOST", on_click=lambda: st.session_state.history.append(0))
+
+        st.button("🗑️ Reset", on_click=lambda: st.session_state.update({"history": []}))
+
+    scorecard_fragment()
 
 # ==========================================
 # 📄 PAGE 2: HAND HELPER (SOLVER)
 # ==========================================
 elif page_selection == "✋ Hand Helper":
-    st.title("Hand Helper")
-    st.caption("Tap to select 5 cards.")
-    
-    suits = ['♠️', '♥️', '♦️', '♣️']
-    ranks = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
-    deck_display = [f"{r}{s}" for r in ranks for s in suits]
-    suit_map = {'♠️':'s', '♥️':'h', '♦️':'d', '♣️':'c'}
-    
-    selected_cards = st.multiselect("Cards", options=deck_display, max_selections=5)
-
-    if len(selected_cards) == 5:
-        clean_hand = []
-        for c_disp in selected_cards:
-            found_suit = False
-            for s_emoji, s_code in suit_map.items():
-                if c_disp.endswith(s_emoji):
-                    r = c_disp.replace(s_emoji, "")
-                    clean_hand.append(f"{r}{s_code}")
-                    found_suit = True
-                    break
-            if not found_suit: clean_hand.append("2s") 
-
-        if st.button("🧠 Solve Hand", type="primary"):
-            best_hold, reason = engine.get_best_hold(clean_hand)
-            with st.spinner("Thinking..."):
-                ev, probs = engine.calculate_outcome_probs(best_hold)
-            
-            st.success(f"Strategy: {reason}")
-            
-            held_display_list = []
-            for i, c_code in enumerate(clean_hand):
-                if c_code in best_hold:
-                    held_display_list.append(selected_cards[i])
-            
-            st.write(f"**HOLD:** {' '.join(held_display_list)}")
-            st.caption(f"Est. EV: {ev:.2f} Credits")
-            
-            # --- RESTORED: Hit Frequency Table ---
-            st.divider()
-            st.write("#### 📊 Outcome Probabilities")
-            hit_data = []
-            # Sort outcomes by probability desc
-            for hand_type, prob in sorted(probs.items(), key=lambda x: x[1], reverse=True):
-                if prob > 0:
-                    hit_data.append({"Result": hand_type, "Chance": f"{prob*100:.1f}%"})
-            
-            if hit_data:
-                st.dataframe(pd.DataFrame(hit_data), hide_index=True, use_container_width=True)
-            else:
-                st.write("No winning outcomes probable.")
+    @st.fragment
+    def hand_helper_fragment():
+        st.title("Hand Helper")
+        st.caption("Tap to select 5 cards.")
+
+        suits = ['♠️', '♥️', '♦️', '♣️']
+        ranks = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
+        deck_display = [f"{r}{s}" for r in ranks for s in suits]
+        suit_map = {'♠️':'s', '♥️':'h', '♦️':'d', '♣️':'c'}
+
+        selected_cards = st.multiselect("Cards", options=deck_display, max_selections=5)
+
+        if len(selected_cards) == 5:
+            clean_hand = []
+            for c_disp in selected_cards:
+                found_suit = False
+                for s_emoji, s_code in suit_map.items():
+                    if c_disp.endswith(s_emoji):
+                        r = c_disp.replace(s_emoji, "")
+                        clean_hand.append(f"{r}{s_code}")
+                        found_suit = True
+                        break
+                if not found_suit: clean_hand.append("2s") 
+
+            if st.button("🧠 Solve Hand", type="primary"):
+                best_hold, reason = engine.get_best_hold(clean_hand)
+                with st.spinner("Thinking..."):
+                    ev, probs = engine.calculate_outcome_probs(best_hold)
+
+                st.success(f"Strategy: {reason}")
+
+                held_display_list = []
+                for i, c_code in enumerate(clean_hand):
+                    if c_code in best_hold:
+                        held_display_list.append(selected_cards[i])
+
+                st.write(f"**HOLD:** {' '.join(held_display_list)}")
+                st.caption(f"Est. EV: {ev:.2f} Credits")
+
+                # --- RESTORED: Hit Frequency Table ---
+                st.divider()
+                st.write("#### 📊 Outcome Probabilities")
+                hit_data = []
+                # Sort outcomes by probability desc
+                for hand_type, prob in sorted(probs.items(), key=lambda x: x[1], reverse=True):
+                    if prob > 0:
+                        hit_data.append({"Result": hand_type, "Chance": f"{prob*100:.1f}%"})
+
+                if hit_data:
+                    st.dataframe(pd.DataFrame(hit_data), hide_index=True, use_container_width=True)
+                else:
+                    st.write("No winning outcomes probable.")
+
+        else:
+            st.info("Pick 5 cards.")
 
-    else:
-        st.info("Pick 5 cards.")
+    hand_helper_fragment()
 
 # ==========================================
 # 📄 PAGE 3: CASE STUDIES (DATA)
@@ -545,6 +728,7 @@ elif page_selection == "🧬 Case Studies":
             "tag_class": "tag-vacuum",
             "desc": "The deck refused to yield Wilds. The player lost 25% of their bankroll in Hand 9.",
             "stat": "Bankroll: $40 → $30 (Stop Loss)",
+            "starts_at_hand": 1,
             "hands": [38.75, 37.5, 36.25, 35.0, 35.0, 33.75, 32.5, 31.25, 30.0, 28.75, 27.5, 26.25, 25.0, 23.75, 22.5, 21.25, 20.0, 18.75],
             "lesson": "🛑 Rule #1: If you drop 25% early, STOP."
         },
@@ -554,6 +738,7 @@ elif page_selection == "🧬 Case Studies":
             "tag_class": "tag-tease",
             "desc": "Classic 'Sub-Surface.' 70 hands played, max bankroll was $38.75. Never profitable.",
             "stat": "Peak Bankroll: $38.75 (Start $40)",
+            "starts_at_hand": 1,
             "hands": [38.75, 37.5, 36.25, 35.0, 35.0, 35.0, 33.75, 37.5, 36.25, 35.0, 38.75, 37.5, 36.25, 35.0, 33.75, 32.5, 31.25, 30.0],
             "lesson": "🛑 Rule #2: If you fight to get back to zero, EXIT."
         },
@@ -563,6 +748,7 @@ elif page_selection == "🧬 Case Studies":
             "tag_class": "tag-zombie",
             "desc": "Lasted 101 hands. Oscillated between $35 and $45 before the inevitable decay.",
             "stat": "Duration: 101 Hands",
+            "starts_at_hand": 1,
             "hands": [38.75, 37.5, 36.25, 36.25, 37.5, 41.25, 40.0, 38.75, 37.5, 38.75, 37.5, 36.25, 35.0, 38.75, 37.5, 36.25, 35.0, 33.75, 32.5, 31.25],
             "lesson": "⏱️ Rule #3: Do not grind. The low payout kills you slowly."
         },
@@ -572,12 +758,30 @@ elif page_selection == "🧬 Case Studies":
             "tag_class": "tag-sniper",
             "desc": "The Apex Case. Two hands, aggressive wins, cashing out at $47.50.",
             "stat": "Profit: +$7.50 (2 Hands)",
+            "starts_at_hand": 0,
             "hands": [40, 43.75, 47.5],
             "lesson": "💰 Rule #4: Hit +20%? CASH OUT."
         }
     ]
 
+    show_envelope = st.toggle("📈 Show Percentile Fan (100k Simulated Amy Bot Sessions)", value=False)
+    if show_envelope:
+        paytable_items = tuple(engine.paytable.items())
+        with st.spinner("Simulating sessions..."):
+            _, _, expected_return = get_hand_payout_distribution(selected_variant, paytable_items)
+            max_hands = max(len(case['hands']) for case in archetypes)
+            full_envelope = get_bankroll_envelope(selected_variant, paytable_items, max_hands + 1)
+        st.caption(
+            f"Bands: 5-95th and 25-75th percentile bankroll per hand, dashed line = median. "
+            f"Simulated with Amy Bot's hold strategy on the {selected_variant} paytable "
+            f"({expected_return:.1%} expected return, below the game's optimal-strategy return)."
+        )
+
     for case in archetypes:
+        envelope = None
+        if show_envelope:
+            offset = case['starts_at_hand']
+            envelope = full_envelope.iloc[offset:offset + len(case['hands'])].assign(Hand=range(len(case['hands'])))
         with st.container():
             st.markdown(f"""
             <div class="case-card">
@@ -589,69 +793,73 @@ elif page_selection == "🧬 Case Studies":
             """, unsafe_allow_html=True)
             
             # Use upgraded chart
-            render_bankroll_chart(case['hands'], archetype=case['name'])
+            render_bankroll_chart(case['hands'], archetype=case['name'], envelope=envelope)
 
 # ==========================================
 # 📄 PAGE 4: RULES & DETAILS
 # ==========================================
 elif page_selection == "📖 Rules":
-    # 📌 Sub-View Routing
-    if st.session_state.current_view == "main":
-        show_rules_page()
-    
-    # 🕵️ DETAIL VIEWS
-    elif st.session_state.current_view == "detail_vacuum":
-        st.button("← Back to Rules", on_click=lambda: st.session_state.update({"current_view": "main"}))
-        st.title("The Vacuum (S44)")
-        st.markdown("**Status:** 🟥 Critical Failure")
-        st.error("Diagnostic: If you lose 25% of your bankroll in the first 15 hands, the deck is cold. Stop.")
-        st.write("### How to Recognize It:")
-        st.write("1. **Bankroll:** Drops steadily (e.g., 40 -> 35 -> 30).")
-        st.write("2. **Deuce Count:** Very low. You aren't seeing any 2s.")
-        st.write("3. **Hand 15 Check:** If you are at $30 or less, you are in a Vacuum.")
-        st.write("### Real Data (Session S44):")
-        hands = [38.75, 37.5, 36.25, 35.0, 35.0, 33.75, 32.5, 31.25, 30.0, 28.75, 27.5, 26.25, 25.0, 23.75, 22.5, 21.25, 20.0, 18.75]
-        render_bankroll_chart(hands, "Vacuum")
-        st.info("Study Frequency: ~19% of sessions.")
-
-    elif st.session_state.current_view == "detail_tease":
-        st.button("← Back to Rules", on_click=lambda: st.session_state.update({"current_view": "main"}))
-        st.title("The Tease (S36)")
-        st.markdown("**Status:** ⚠️ Sub-Surface")
-        st.warning("Diagnostic: You are fighting to get back to zero. You never see 'profit air'.")
-        st.write("### How to Recognize It:")
-        st.write("1. **The Waterline:** Your bankroll hits $40 but never $41.25.")
-        st.write("2. **False Hope:** You hit a 4-of-a-Kind, but it just pays for previous losses.")
-        st.write("3. **Action:** If you are 'Sub-Surface' for 20 hands, leave.")
-        st.write("### Real Data (Session S36):")
-        hands = [38.75, 37.5, 36.25, 35.0, 35.0, 35.0, 33.75, 37.5, 36.25, 35.0, 38.75, 37.5, 36.25, 35.0, 33.75, 32.5, 31.25, 30.0]
-        render_bankroll_chart(hands, "Tease")
-        st.info("Study Frequency: ~15% of sessions.")
-
-    elif st.session_state.current_view == "detail_zombie":
-        st.button("← Back to Rules", on_click=lambda: st.session_state.update({"current_view": "main"}))
-        st.title("The Zombie (S25)")
-        st.markdown("**Status:** 🧟 Undead / Grinding")
-        st.warning("Diagnostic: The most common trap. You play for 45+ minutes and end up losing.")
-        st.write("### How to Recognize It:")
-        st.write("1. **High Push Rate:** You get lots of 3-of-a-Kind (Money back).")
-        st.write("2. **The Check:** It is Hand 40. Are you above $40? If no -> Zombie.")
-        st.write("3. **Logic:** The payout for 5-of-a-Kind (12) is too low to sustain a long game.")
-        st.write("### Real Data (Session S25):")
-        hands = [38.75, 37.5, 36.25, 36.25, 37.5, 41.25, 40.0, 38.75, 37.5, 38.75, 37.5, 36.25, 35.0, 38.75, 37.5, 36.25, 35.0, 33.75, 32.5, 31.25]
-        render_bankroll_chart(hands, "Zombie")
-        st.info("Study Frequency: ~38% of sessions.")
-
-    elif st.session_state.current_view == "detail_sniper":
-        st.button("← Back to Rules", on_click=lambda: st.session_state.update({"current_view": "main"}))
-        st.title("The Sniper (S30)")
-        st.markdown("**Status:** 🟢 Winner")
-        st.success("Diagnostic: The only way to win consistently is to hit early and leave.")
-        st.write("### How to Recognize It:")
-        st.write("1. **The Spike:** You go up 20% (to $48) in the first 10 minutes.")
-        st.write("2. **The Feeling:** 'I am on a heater.'")
-        st.write("3. **The Trap:** Thinking it will last forever. It won't. Cash out.")
-        st.write("### Real Data (Session S30):")
-        hands = [40, 43.75, 47.5]
-        render_bankroll_chart(hands, "Sniper")
-        st.info("Study Frequency: ~27% of sessions.")
+    @st.fragment
+    def rules_fragment():
+        # 📌 Sub-View Routing
+        if st.session_state.current_view == "main":
+            show_rules_page()
+
+        # 🕵️ DETAIL VIEWS
+        elif st.session_state.current_view == "detail_vacuum":
+            st.button("← Back to Rules", on_click=lambda: st.session_state.update({"current_view": "main"}))
+            st.title("The Vacuum (S44)")
+            st.markdown("**Status:** 🟥 Critical Failure")
+            st.error("Diagnostic: If you lose 25% of your bankroll in the first 15 hands, the deck is cold. Stop.")
+            st.write("### How to Recognize It:")
+            st.write("1. **Bankroll:** Drops steadily (e.g., 40 -> 35 -> 30).")
+            st.write("2. **Deuce Count:** Very low. You aren't seeing any 2s.")
+            st.write("3. **Hand 15 Check:** If you are at $30 or less, you are in a Vacuum.")
+            st.write("### Real Data (Session S44):")
+            hands = [38.75, 37.5, 36.25, 35.0, 35.0, 33.75, 32.5, 31.25, 30.0, 28.75, 27.5, 26.25, 25.0, 23.75, 22.5, 21.25, 20.0, 18.75]
+            render_bankroll_chart(hands, "Vacuum")
+            st.info("Study Frequency: ~19% of sessions.")
+
+        elif st.session_state.current_view == "detail_tease":
+            st.button("← Back to Rules", on_click=lambda: st.session_state.update({"current_view": "main"}))
+            st.title("The Tease (S36)")
+            st.markdown("**Status:** ⚠️ Sub-Surface")
+            st.warning("Diagnostic: You are fighting to get back to zero. You never see 'profit air'.")
+            st.write("### How to Recognize It:")
+            st.write("1. **The Waterline:** Your bankroll hits $40 but never $41.25.")
+            st.write("2. **False Hope:** You hit a 4-of-a-Kind, but it just pays for previous losses.")
+            st.write("3. **Action:** If you are 'Sub-Surface' for 20 hands, leave.")
+            st.write("### Real Data (Session S36):")
+            hands = [38.75, 37.5, 36.25, 35.0, 35.0, 35.0, 33.75, 37.5, 36.25, 35.0, 38.75, 37.5, 36.25, 35.0, 33.75, 32.5, 31.25, 30.0]
+            render_bankroll_chart(hands, "Tease")
+            st.info("Study Frequency: ~15% of sessions.")
+
+        elif st.session_state.current_view == "detail_zombie":
+            st.button("← Back to Rules", on_click=lambda: st.session_state.update({"current_view": "main"}))
+            st.title("The Zombie (S25)")
+            st.markdown("**Status:** 🧟 Undead / Grinding")
+            st.warning("Diagnostic: The most common trap. You play for 45+ minutes and end up losing.")
+            st.write("### How to Recognize It:")
+            st.write("1. **High Push Rate:** You get lots of 3-of-a-Kind (Money back).")
+            st.write("2. **The Check:** It is Hand 40. Are you above $40? If no -> Zombie.")
+            st.write("3. **Logic:** The payout for 5-of-a-Kind (12) is too low to sustain a long game.")
+            st.write("### Real Data (Session S25):")
+            hands = [38.75, 37.5, 36.25, 36.25, 37.5, 41.25, 40.0, 38.75, 37.5, 38.75, 37.5, 36.25, 35.0, 38.75, 37.5, 36.25, 35.0, 33.75, 32.5, 31.25]
+            render_bankroll_chart(hands, "Zombie")
+            st.info("Study Frequency: ~38% of sessions.")
+
+        elif st.session_state.current_view == "detail_sniper":
+            st.button("← Back to Rules", on_click=lambda: st.session_state.update({"current_view": "main"}))
+            st.title("The Sniper (S30)")
+            st.markdown("**Status:** 🟢 Winner")
+            st.success("Diagnostic: The only way to win consistently is to hit early and leave.")
+            st.write("### How to Recognize It:")
+            st.write("1. **The Spike:** You go up 20% (to $48) in the first 10 minutes.")
+            st.write("2. **The Feeling:** 'I am on a heater.'")
+            st.write("3. **The Trap:** Thinking it will last forever. It won't. Cash out.")
+            st.write("### Real Data (Session S30):")
+            hands = [40, 43.75, 47.5]
+            render_bankroll_chart(hands, "Sniper")
+            st.info("Study Frequency: ~27% of sessions.")
+
+    rules_fragment()